@@ -1,13 +1,28 @@
 # admin_app.py (Admin Dashboard)
 import os
+import numpy as np
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from utils.gemini_helper import genai_generate_text
+from utils.gemini_helper import genai_generate_json
 
 load_dotenv()
 
 DATA_FILE = "data/submissions.csv"
+# rating is 1-5 so int8 is enough; everything else is read verbatim as text
+DTYPES = {"id": "string", "timestamp": "string", "rating": "int8", "review": "string",
+          "ai_response": "string", "ai_summary": "string", "ai_actions": "string"}
+MAX_SELECT_IDS = 200
+PAGE_SIZE = 50
+# the same review always formats to the same prompt; re-runs bypass the LLM cache
+# (use_cache=False) so the button really asks Gemini again, and refresh the entry
+RERUN_TMPL = ("Return JSON with 'summary' (one short sentence) and 'actions' (up to 3 recommended "
+              'actions a business owner should take) for this review: "{review}"')
+RERUN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"summary": {"type": "STRING"}, "actions": {"type": "ARRAY", "items": {"type": "STRING"}}},
+    "required": ["summary", "actions"],
+}
 os.makedirs("data", exist_ok=True)
 if not os.path.exists(DATA_FILE):
     pd.DataFrame(columns=["id","timestamp","rating","review","ai_response","ai_summary","ai_actions"]).to_csv(DATA_FILE, index=False)
@@ -15,30 +30,70 @@ if not os.path.exists(DATA_FILE):
 st.set_page_config(page_title="Fynd AI — Admin", layout="wide")
 st.title("Admin Dashboard — Submissions")
 
-df = pd.read_csv(DATA_FILE)
+@st.cache_data
+def load_submissions(mtime):
+    # keyed on the file's mtime so a new submission or an edit invalidates it. The C parser
+    # applies DTYPES as it reads (the pyarrow engine infers types first and would rewrite
+    # timestamps, ids and numeric-looking reviews), and only empty cells count as missing
+    return pd.read_csv(DATA_FILE, dtype=DTYPES, keep_default_na=False, na_values=[""])
+
+@st.cache_data
+def load_sorted_submissions(mtime):
+    # newest first; sorted once per data change and shared by every view. Sort on the parsed
+    # time, not the text, so "T" and space-separated ISO timestamps order correctly
+    return (load_submissions(mtime)
+            .sort_values("timestamp", ascending=False, kind="stable",
+                         key=lambda s: pd.to_datetime(s, format="ISO8601", errors="coerce"))
+            .reset_index(drop=True))
+
+@st.cache_data
+def load_row_map(mtime):
+    # {id: row dict} so the detail view is a dict lookup rather than a frame scan; the CSV
+    # is hand-editable, so keep the first row of a duplicated id instead of failing
+    return load_submissions(mtime).drop_duplicates("id").set_index("id").to_dict(orient="index")
+
+@st.cache_data
+def load_rating_counts(mtime):
+    # ratings are 1-5, so a single bincount pass gives the whole histogram
+    counts = np.bincount(load_submissions(mtime)['rating'].to_numpy(dtype=np.int8), minlength=6)
+    return pd.Series(counts[1:6], index=range(1, 6))
+
+mtime = os.path.getmtime(DATA_FILE)
+df = load_submissions(mtime)
 
 st.markdown(f"**Total submissions:** {len(df)} — **Avg rating:** {df['rating'].mean() if len(df)>0 else 'N/A'}")
 
 if len(df) == 0:
     st.info("No submissions yet. Public users can submit reviews via the User Dashboard.")
 else:
+    df_sorted = load_sorted_submissions(mtime)
     view = st.radio("View options", ["Table", "Analytics", "Detail / Re-run AI"], index=0)
 
     if view == "Table":
-        st.dataframe(df.sort_values("timestamp", ascending=False).reset_index(drop=True))
+        # send one page to the browser rather than the whole frame
+        n_pages = max(1, -(-len(df_sorted) // PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+        st.caption(f"Page {page} of {n_pages}")
+        st.dataframe(df_sorted.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE])
 
     elif view == "Analytics":
         st.subheader("Rating distribution")
-        st.bar_chart(df['rating'].value_counts().sort_index())
+        st.bar_chart(load_rating_counts(mtime))
         st.subheader("Latest summaries")
-        st.table(df.sort_values("timestamp", ascending=False)[["timestamp","rating","ai_summary"]].head(10))
+        st.table(df_sorted[["timestamp","rating","ai_summary"]].head(10))
 
     else:
         st.subheader("Re-run AI for an entry")
-        ids = df['id'].tolist()
-        sel_id = st.selectbox("Select submission id", ids)
+        # only the newest entries go into the widget; older ones can be looked up by id
+        sel_id = st.selectbox("Select submission id", df_sorted['id'].head(MAX_SELECT_IDS))
+        older_id = st.text_input("Or paste an older submission id").strip()
+        row_map = load_row_map(mtime)
+        if older_id and older_id in row_map:
+            sel_id = older_id
+        elif older_id:
+            st.warning("No submission with that id.")
         if sel_id:
-            sel_row = df[df['id'] == sel_id].iloc[0]
+            sel_row = row_map[sel_id]
             st.markdown("**Review:**")
             st.write(sel_row['review'])
             st.markdown("**Current AI Summary:**")
@@ -48,12 +103,24 @@ else:
 
             if st.button("Re-run summary & actions"):
                 with st.spinner("Re-running AI..."):
-                    ok_s, new_summary = genai_generate_text(f"Summarize this review in one short sentence: \"{sel_row['review']}\"")
-                    ok_a, new_actions = genai_generate_text(f"Give up to 3 recommended actions (bullet points) for this review: \"{sel_row['review']}\"")
-                    if ok_s:
-                        df.loc[df['id'] == sel_id, 'ai_summary'] = new_summary
-                    if ok_a:
-                        df.loc[df['id'] == sel_id, 'ai_actions'] = new_actions
-                    df.to_csv(DATA_FILE, index=False)
+                    # one round-trip for both fields instead of two separate prompts
+                    ok, out = genai_generate_json(RERUN_TMPL.format(review=str(sel_row['review']).strip()),
+                                                  schema=RERUN_SCHEMA, use_cache=False)
+                    if ok:
+                        # index by id so the update is a label lookup, not a full-column scan
+                        df = df.set_index("id", drop=False)
+                        if out.get('summary'):
+                            df.at[sel_id, 'ai_summary'] = out['summary']
+                        actions = out.get('actions')
+                        if isinstance(actions, list):
+                            actions = "\n".join(f"- {a}" for a in actions)
+                        if actions:
+                            df.at[sel_id, 'ai_actions'] = actions
+                        df.to_csv(DATA_FILE, index=False)
+                    # don't rely on mtime alone: coarse-grained filesystems can leave it unchanged
+                    load_submissions.clear()
+                    load_sorted_submissions.clear()
+                    load_row_map.clear()
+                    load_rating_counts.clear()
                 st.success("Updated AI outputs for selected entry.")
-                st.experimental_rerun()
+                st.rerun()
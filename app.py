@@ -1,20 +1,90 @@
-import os, uuid
+import os, re, csv, time, uuid, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from utils.gemini_helper import genai_generate_text
+from utils.gemini_helper import genai_generate_json
 
 load_dotenv()
 
 DATA_FILE = "data/submissions.csv"
+MAX_RESULTS = 5  # most recent submissions kept on screen
+COLS = ["id","timestamp","rating","review","ai_response","ai_summary","ai_actions"]
 os.makedirs("data", exist_ok=True)
 if not os.path.exists(DATA_FILE):
-    pd.DataFrame(columns=["id","timestamp","rating","review","ai_response","ai_summary","ai_actions"]).to_csv(DATA_FILE, index=False)
+    pd.DataFrame(columns=COLS).to_csv(DATA_FILE, index=False)
+
+# Offline fallback for the actions prompt: keyword -> suggested action. All
+# keywords go into one alternation so a review is scanned once, not per keyword.
+ACTION_RULES = [
+    (["slow","wait","waiting","delay"], "- Investigate service speed and staffing."),
+    (["cold","undercooked","burnt","temperature"], "- Check food preparation & temperature controls."),
+    (["rude","unfriendly","hostile"], "- Provide staff training on customer service."),
+]
+_KEYWORD_RULE = {w: i for i, (words, _) in enumerate(ACTION_RULES) for w in words}
+_KEYWORD_RE = re.compile("|".join(re.escape(w) for w in sorted(_KEYWORD_RULE, key=len, reverse=True)))
+
+# built with .format(review=review.strip()) so identical reviews give identical prompts (and cache keys)
+SUBMIT_TMPL = ("Return JSON with 'reply' (a short friendly reply, 1-2 sentences), 'summary' (the review in one "
+               "short sentence) and 'actions' (up to 3 recommended actions a business owner should take) "
+               'for this review: "{review}"')
+SUBMIT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "reply": {"type": "STRING"},
+        "summary": {"type": "STRING"},
+        "actions": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["reply", "summary", "actions"],
+}
+
+def run_ai(review):
+    # one structured call returns all three fields; fallbacks fill in whatever is missing
+    try:
+        ok, out = genai_generate_json(SUBMIT_TMPL.format(review=review.strip()), schema=SUBMIT_SCHEMA)
+    except Exception:
+        # runs on a worker thread: an error here must not cost the user their submission
+        ok = False
+    if not ok:
+        out = {}
+    ai_response = out.get("reply")
+    ai_summary = out.get("summary")
+    ai_actions = out.get("actions")
+    if isinstance(ai_actions, list):
+        ai_actions = "\n".join(f"- {a}" for a in ai_actions)
+
+    if not ai_response:
+        ai_response = "Thanks for your feedback! We appreciate you taking the time to write us. (AI currently unavailable.)"
+    if not ai_summary:
+        ai_summary = review.strip()[:200]
+    if not ai_actions:
+        hits = {_KEYWORD_RULE[w] for w in _KEYWORD_RE.findall(review.lower())}
+        suggestions = [ACTION_RULES[i][1] for i in sorted(hits)]
+        if not suggestions:
+            suggestions = ["- Thank the customer and ask for more details."]
+        ai_actions = "\n".join(suggestions)
+    return ai_response, ai_summary, ai_actions
+
+def process_submission(row, write_lock):
+    # runs on a worker thread: no st.* calls in here
+    row["ai_response"], row["ai_summary"], row["ai_actions"] = run_ai(row["review"])
+    # append just this row; re-reading and rewriting the whole file is O(N) per submit
+    with write_lock, open(DATA_FILE, "a", newline="", encoding="utf8") as fh:
+        csv.writer(fh, lineterminator="\n").writerow([row[c] for c in COLS])
+    return row
+
+@st.cache_resource
+def get_worker_pool():
+    # shared by every session; the script reruns but the pool and lock must not be recreated
+    return ThreadPoolExecutor(max_workers=4), threading.Lock()
 
 st.set_page_config(page_title="Fynd AI — User", layout="wide")
 st.title("User Dashboard — Submit a Review")
 
+pending = st.session_state.setdefault("pending", [])
+results = st.session_state.setdefault("results", [])
+
 with st.form("review_form"):
     rating = st.slider("Select rating (1 to 5)", 1, 5, 5)
     review = st.text_area("Write a short review", height=140)
@@ -24,49 +94,36 @@ if submitted:
     if not review.strip():
         st.warning("Please write a short review before submitting.")
     else:
-        with st.spinner("Generating AI outputs..."):
-            prompt_reply = f"Write a short friendly reply (1-2 sentences) to this review: \"{review}\""
-            prompt_summary = f"Summarize the review in one short sentence: \"{review}\""
-            prompt_actions = f"Give up to 3 recommended actions (bullet points) a business owner should take based on: \"{review}\""
-
-            ok_r, ai_response = genai_generate_text(prompt_reply)
-            ok_s, ai_summary = genai_generate_text(prompt_summary)
-            ok_a, ai_actions = genai_generate_text(prompt_actions)
-
-            if not ok_r:
-                ai_response = "Thanks for your feedback! We appreciate you taking the time to write us. (AI currently unavailable.)"
-            if not ok_s:
-                ai_summary = review.strip()[:200]
-            if not ok_a:
-                low = review.lower()
-                suggestions = []
-                if any(w in low for w in ["slow","wait","waiting","delay"]):
-                    suggestions.append("- Investigate service speed and staffing.")
-                if any(w in low for w in ["cold","undercooked","burnt","temperature"]):
-                    suggestions.append("- Check food preparation & temperature controls.")
-                if any(w in low for w in ["rude","unfriendly","hostile"]):
-                    suggestions.append("- Provide staff training on customer service.")
-                if not suggestions:
-                    suggestions = ["- Thank the customer and ask for more details."]
-                ai_actions = "\n".join(suggestions)
-
         row = {
             "id": str(uuid.uuid4()),
             "timestamp": datetime.utcnow().isoformat(),
             "rating": int(rating),
             "review": review,
-            "ai_response": ai_response,
-            "ai_summary": ai_summary,
-            "ai_actions": ai_actions
         }
+        # Gemini runs off the script thread so the page stays interactive meanwhile
+        pool, write_lock = get_worker_pool()
+        pending.append(pool.submit(process_submission, row, write_lock))
 
-        df = pd.read_csv(DATA_FILE)
-        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-        df.to_csv(DATA_FILE, index=False)
+for fut in [f for f in pending if f.done()]:
+    pending.remove(fut)
+    if fut.exception() is not None:
+        st.error(f"Sorry, your submission could not be saved: {fut.exception()}")
+        continue
+    results.insert(0, fut.result())
+del results[MAX_RESULTS:]
 
+for i, row in enumerate(results):
+    if i == 0:
         st.success("Submitted — AI reply shown below.")
-        st.write(ai_response)
-        st.subheader("AI Summary")
-        st.write(ai_summary)
-        st.subheader("AI Recommended Actions")
-        st.write(ai_actions)
+    else:
+        st.divider()
+    st.write(row["ai_response"])
+    st.subheader("AI Summary")
+    st.write(row["ai_summary"])
+    st.subheader("AI Recommended Actions")
+    st.write(row["ai_actions"])
+
+if pending:
+    st.info(f"Generating AI outputs for {len(pending)} submission(s)...")
+    time.sleep(0.5)
+    st.rerun()
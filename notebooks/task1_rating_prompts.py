@@ -1,95 +1,152 @@
-import os,sys, time, json
+import os,sys, re, json, asyncio
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+import numpy as np
 import pandas as pd
 from sklearn.metrics import accuracy_score
 from dotenv import load_dotenv
-from utils.gemini_helper import genai_generate_text
+from utils.gemini_helper import genai_generate_text_async, AsyncRateLimiter
+try:
+    from orjson import loads as json_loads  # C parser, used when available
+except ImportError:
+    json_loads = json.loads
 
 load_dotenv()
 
 os.makedirs("data", exist_ok=True)
 os.makedirs("outputs", exist_ok=True)
 
-df = pd.read_csv("data/yelp.csv")
-cols = {c:c.lower() for c in df.columns}
-df = df.rename(columns=cols)
-
-if 'text' in df.columns:
-    df = df.rename(columns={'text':'review'})
-if 'review' not in df.columns:
-    for c in df.columns:
-        if 'review' in c:
-            df = df.rename(columns={c:'review'})
-            break
-if 'stars' not in df.columns:
-    for c in df.columns:
-        if 'star' in c or 'rating' in c:
-            df = df.rename(columns={c:'stars'})
-            break
-if 'review' not in df.columns or 'stars' not in df.columns:
+# read the header first, then parse only the review text and star columns
+cols = {c.lower():c for c in pd.read_csv("data/yelp.csv", nrows=0).columns}
+review_col = cols.get('text') or cols.get('review') or next((c for l, c in cols.items() if 'review' in l), None)
+stars_col = cols.get('stars') or next((c for l, c in cols.items() if 'star' in l or 'rating' in l), None)
+if review_col is None or stars_col is None:
     raise RuntimeError("Could not find 'review' and 'stars' columns in data/yelp.csv")
+df = pd.read_csv("data/yelp.csv", usecols=[review_col, stars_col], dtype={review_col:'string', stars_col:'int8'})
+df = df.rename(columns={review_col:'review', stars_col:'stars'})
 
 sample_n = min(200, len(df))
-sample = df.sample(n=sample_n, random_state=42)[['review','stars']].reset_index(drop=True)
+# draw row positions directly rather than shuffling the whole frame; sorted for in-order access
+idx = np.sort(np.random.default_rng(42).choice(len(df), size=sample_n, replace=False))
+sample = df.iloc[idx][['review','stars']].reset_index(drop=True)
 sample = sample.rename(columns={'stars':'true_stars'})
 sample.to_csv("data/eval_sample.csv", index=False)
 
-PROMPT_A = '''You are a concise assistant. Read the review and output EXACTLY a valid JSON object with keys:\n{{"predicted_stars": <integer 1-5>, "explanation":"<brief reason>"}}\nReturn only the JSON object and nothing else.\n\nReview:\n\"\"\"{review}\"\"\"'''
+# Each call rates BATCH_SIZE numbered reviews and answers with a JSON array, one object per
+# review, so the shared instructions are sent once per batch rather than once per review.
+# The PROMPT_* texts go in system_instruction and only the reviews in contents, which keeps
+# the request prefix identical across calls for Gemini's implicit prompt caching.
+BATCH_SIZE = 10
 
-PROMPT_B = '''You are an assistant that maps user reviews to 1-5 star ratings.\nExamples:\nReview: "Food was cold and service was slow." -> 1\nReview: "Great food and friendly staff, would return." -> 4\nReview: "Okay for price, not special." -> 3\n\nNow read the review and output EXACTLY a JSON object: {{\"predicted_stars\": <1-5>, \"explanation\":\"<brief reason>\"}}. Nothing else.\n\nReview:\n\"\"\"{review}\"\"\"'''
+PROMPT_A = '''You are a concise assistant. Read each numbered review and output EXACTLY a valid JSON array with one object per review, in order:\n[{"index": <review number>, "predicted_stars": <integer 1-5>, "explanation":"<brief reason>"}, ...]\nReturn only the JSON array and nothing else.'''
 
-PROMPT_C = '''First output one short line with sentiment polarity and strength like:\nSentiment: positive (strength: high)\nThen output EXACTLY a JSON object with keys {{\"predicted_stars\" (1-5), \"explanation\"}}. Do not output anything else.\n\nReview:\n\"\"\"{review}\"\"\"'''
+PROMPT_B = '''You are an assistant that maps user reviews to 1-5 star ratings.\nExamples:\nReview: "Food was cold and service was slow." -> 1\nReview: "Great food and friendly staff, would return." -> 4\nReview: "Okay for price, not special." -> 3\n\nNow read each numbered review and output EXACTLY a JSON array with one object per review, in order: [{\"index\": <review number>, \"predicted_stars\": <1-5>, \"explanation\":\"<brief reason>\"}, ...]. Nothing else.'''
 
-results = {}
-for name, prompt_template in [('A', PROMPT_A), ('B', PROMPT_B), ('C', PROMPT_C)]:
-    outs = []
-    for _, row in sample.iterrows():
-        prompt = prompt_template.format(review=row['review'])
-        ok, text = genai_generate_text(prompt, temperature=0.0)
-        if not ok:
-            text = text
-        outs.append(text)
-        time.sleep(0.12)
-    sample[f'raw_{name}'] = outs
-    preds = []
-    valids = []
-    for out in outs:
+PROMPT_C = '''For each numbered review, first judge its sentiment polarity and strength (like: positive (strength: high)), then rate it.\nOutput EXACTLY a JSON array with one object per review, in order, with keys {\"index\", \"sentiment\", \"predicted_stars\" (1-5), \"explanation\"}. Do not output anything else.'''
+
+# Max requests in flight, and the Gemini requests-per-minute quota for this tier.
+CONCURRENCY = 16
+RPM = 500
+
+async def _one(instructions, contents, sem, limiter):
+    async with sem, limiter:
+        ok, text = await genai_generate_text_async(contents, temperature=0.0,
+                                                   config={"system_instruction": instructions},
+                                                   validate=_is_json_array)
+        return text
+
+def _is_json_array(out):
+    # only batches that parse get cached, so a garbled reply is retried on the next run
+    start = out.find('['); end = out.rfind(']')
+    try:
+        return start != -1 and isinstance(json_loads(out[start:end+1]), list)
+    except ValueError:
+        return False
+
+def _numbered(batch):
+    return "Reviews:\n" + "\n".join(f'{i}. """{r}"""' for i, r in enumerate(batch, start=1))
+
+def _split_batch(out, n):
+    # one JSON string per review of the batch (None where the model skipped or garbled it),
+    # so the per-review star extraction below works unchanged
+    per_review = [None] * n
+    if not isinstance(out, str):
+        return per_review
+    start = out.find('['); end = out.rfind(']')
+    if start==-1 or end==-1:
+        return per_review
+    try:
+        items = json_loads(out[start:end+1])
+    except ValueError:
+        return per_review
+    for pos, item in enumerate(items if isinstance(items, list) else []):
+        if not isinstance(item, dict):
+            continue
         try:
-            s = out
-            if not isinstance(s, str):
-                preds.append(None); valids.append(False); continue
-            start = s.find('{'); end = s.rfind('}')
-            if start==-1 or end==-1:
-                preds.append(None); valids.append(False); continue
-            j = json.loads(s[start:end+1])
-            ps = j.get('predicted_stars')
-            if isinstance(ps, int) and 1<=ps<=5:
-                preds.append(ps); valids.append(True)
-            else:
-                try:
-                    ival = int(ps)
-                    if 1<=ival<=5:
-                        preds.append(ival); valids.append(True)
-                    else:
-                        preds.append(None); valids.append(False)
-                except Exception:
-                    preds.append(None); valids.append(False)
-        except Exception:
-            preds.append(None); valids.append(False)
+            i = int(item.get('index', pos + 1)) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < n:
+            per_review[i] = json.dumps(item)
+    return per_review
+
+async def _run_prompts(prompts, reviews):
+    # every (variant, batch) call goes into one gather so all of them overlap
+    sem = asyncio.Semaphore(CONCURRENCY)
+    limiter = AsyncRateLimiter(RPM, 60)
+    batches = [reviews[i:i + BATCH_SIZE] for i in range(0, len(reviews), BATCH_SIZE)]
+    contents = [_numbered(b) for b in batches]
+    outs = await asyncio.gather(*[_one(instructions, c, sem, limiter) for _, instructions in prompts for c in contents])
+    # gather keeps submission order, so each variant's outputs are one contiguous slice
+    nb = len(batches)
+    return {
+        name: [r for out, b in zip(outs[i * nb:(i + 1) * nb], batches) for r in _split_batch(out, len(b))]
+        for i, (name, _) in enumerate(prompts)
+    }
+
+PROMPTS = [('A', PROMPT_A), ('B', PROMPT_B), ('C', PROMPT_C)]
+# plain list of str: no per-row Series construction while building prompts
+reviews = sample['review'].tolist()
+raw = asyncio.run(_run_prompts(PROMPTS, reviews))
+
+def _parse_stars(out):
+    # slow path for outputs the regex can't read: parse the JSON object properly
+    if not isinstance(out, str):
+        return None
+    start = out.find('{'); end = out.rfind('}')
+    if start==-1 or end==-1:
+        return None
+    try:
+        ival = int(json_loads(out[start:end+1]).get('predicted_stars'))
+    except Exception:
+        return None
+    return ival if 1<=ival<=5 else None
+
+STARS_RE = re.compile(r'"predicted_stars"\s*:\s*"?([1-5])(?!\d)')
+
+results = {}
+for name, _ in PROMPTS:
+    sample[f'raw_{name}'] = raw[name]
+    # vectorised extraction covers almost every row; JSON parsing only runs on the misses
+    preds = sample[f'raw_{name}'].str.extract(STARS_RE, expand=False).astype('Int8')
+    miss = preds.isna()
+    if miss.any():
+        preds[miss] = sample.loc[miss, f'raw_{name}'].map(_parse_stars)
+    valids = preds.notna().to_numpy()
     sample[f'pred_{name}'] = preds
     sample[f'valid_{name}'] = valids
-    results[name] = sample[[f'pred_{name}', f'valid_{name}']]
+    # typed int8/bool arrays (-1 = no prediction) for the scoring below
+    results[name] = (preds.to_numpy(dtype='int8', na_value=-1), valids)
 
 summary = []
-for name in ['A','B','C']:
-    valid_mask = sample[f'valid_{name}']
-    json_valid_rate = sum(valid_mask)/len(valid_mask)
-    valid_rows = sample[valid_mask]
+true_stars = sample['true_stars'].to_numpy()
+for name, _ in PROMPTS:
+    preds, valids = results[name]
+    json_valid_rate = valids.mean()
     acc = None
-    if len(valid_rows)>0:
-        acc = accuracy_score(valid_rows['true_stars'], valid_rows[f'pred_{name}'])
+    if valids.any():
+        acc = accuracy_score(true_stars[valids], preds[valids])
     summary.append({'Approach':name, 'Accuracy':acc, 'JSON_valid_rate':json_valid_rate})
 
 pd.DataFrame(summary).to_csv('outputs/summary_table.csv', index=False)
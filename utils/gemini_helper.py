@@ -1,15 +1,29 @@
 # utils/gemini_helper.py
-import os, logging, traceback, json, time
-from tenacity import retry, wait_exponential, stop_after_attempt
+import os, logging, json, time, hashlib, threading, sqlite3, asyncio
+from collections import OrderedDict
+from tenacity import retry, AsyncRetrying, wait_exponential, stop_after_attempt
 from google import genai
 
 os.makedirs("logs", exist_ok=True)
 logging.basicConfig(filename="logs/genai_errors.log",
-                    level=logging.DEBUG,
+                    level=logging.WARNING,
                     format="%(asctime)s %(levelname)s %(message)s")
 
 MODEL = "gemini-2.5-flash-lite"
 
+# Successful responses are cached keyed by sha256(model, temperature, prompt, config),
+# so duplicate reviews, admin re-runs and notebook re-executions skip the round-trip.
+# Two tiers: an in-process LRU dict (at most CACHE_MAX_ENTRIES) backed by a sqlite file
+# that persists across processes; entries in both expire CACHE_TTL seconds after they
+# were stored. Delete CACHE_DB to force fresh responses.
+CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 1024
+CACHE_DB = "data/llm_cache.sqlite"
+CACHE_STATS = {"hits": 0, "misses": 0}
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_DB = None
+
 def get_client():
     try:
         client = genai.Client()
@@ -24,11 +38,11 @@ def _extract_text_from_response(resp):
     try:
         if isinstance(resp, str):
             return True, resp, "str"
-        if hasattr(resp, "text"):
-            try:
-                return True, resp.text, "has .text"
-            except Exception:
-                pass
+        # fast path: SDK responses almost always carry a non-empty .text; only fall
+        # into the probing cascade below when they don't
+        text = getattr(resp, "text", None)
+        if isinstance(text, str) and text:
+            return True, text, "has .text"
         if hasattr(resp, "candidates"):
             try:
                 cand0 = resp.candidates[0]
@@ -78,16 +92,181 @@ def _extract_text_from_response(resp):
     except Exception as exc:
         return False, None, f"_extract_text_exception: {repr(exc)}"
 
+def _cache_key(prompt, temperature=0.0, config=None):
+    payload = json.dumps({"model": MODEL, "temperature": temperature, "prompt": prompt, "config": config},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+def _cache_db():
+    # caller holds _CACHE_LOCK; returns None if the disk tier is unavailable (e.g. read-only FS)
+    global _DB
+    if _DB is None:
+        try:
+            os.makedirs(os.path.dirname(CACHE_DB), exist_ok=True)
+            _DB = sqlite3.connect(CACHE_DB, check_same_thread=False)
+            _DB.execute("CREATE TABLE IF NOT EXISTS llm_cache "
+                        "(key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL DEFAULT 0)")
+            if "created_at" not in {r[1] for r in _DB.execute("PRAGMA table_info(llm_cache)")}:
+                # files from before expiry was tracked: their rows count as expired
+                _DB.execute("ALTER TABLE llm_cache ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+            with _DB:
+                _DB.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - CACHE_TTL,))
+        except sqlite3.Error:
+            logging.error("LLM disk cache unavailable", exc_info=True)
+            _DB = False
+    return _DB or None
+
+def _cache_put_memory(key, created_at, text):
+    # caller holds _CACHE_LOCK; evicts least recently used entries beyond CACHE_MAX_ENTRIES
+    _CACHE[key] = (created_at, text)
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+
+def _cache_get(key):
+    with _CACHE_LOCK:
+        now = time.time()
+        entry = _CACHE.get(key)
+        if entry and now - entry[0] < CACHE_TTL:
+            _CACHE.move_to_end(key)
+            CACHE_STATS["hits"] += 1
+            return entry[1]
+        _CACHE.pop(key, None)
+        db = _cache_db()
+        row = None
+        if db:
+            try:
+                row = db.execute("SELECT text, created_at FROM llm_cache WHERE key = ? AND created_at >= ?",
+                                 (key, now - CACHE_TTL)).fetchone()
+            except sqlite3.Error:
+                # e.g. another process holds the write lock: treat as a miss
+                logging.error("Failed to read LLM disk cache", exc_info=True)
+        if row:
+            _cache_put_memory(key, row[1], row[0])
+            CACHE_STATS["hits"] += 1
+            return row[0]
+        CACHE_STATS["misses"] += 1
+        return None
+
+def _cache_set(key, text):
+    with _CACHE_LOCK:
+        now = time.time()
+        _cache_put_memory(key, now, text)
+        db = _cache_db()
+        if db:
+            try:
+                with db:
+                    db.execute("INSERT OR REPLACE INTO llm_cache (key, text, created_at) VALUES (?, ?, ?)",
+                               (key, text, now))
+            except sqlite3.Error:
+                logging.error("Failed to write LLM disk cache", exc_info=True)
+
+def _cacheable(text, validate):
+    # validate(text) -> bool lets callers keep unusable replies (e.g. broken JSON) out of the cache
+    return validate is None or validate(text)
+
+def genai_generate_text(prompt, temperature=0.0, max_output_tokens=250, config=None, validate=None,
+                        use_cache=True):
+    # use_cache=False always calls the API (explicit re-runs) but still refreshes the cache
+    key = _cache_key(prompt, temperature, config)
+    cached = _cache_get(key) if use_cache else None
+    if cached is not None and _cacheable(cached, validate):
+        return True, cached
+    ok, text = _genai_generate_text(prompt, temperature=temperature, max_output_tokens=max_output_tokens, config=config)
+    if ok and _cacheable(text, validate):
+        _cache_set(key, text)
+    return ok, text
+
+def _parse_json_object(text):
+    try:
+        data = json.loads(text[text.find("{"):text.rfind("}") + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def genai_generate_json(prompt, schema=None, use_cache=True):
+    """Ask for a JSON response (structured output) and return (ok, dict | error message)."""
+    config = {"response_mime_type": "application/json"}
+    if schema:
+        config["response_schema"] = schema
+    ok, text = genai_generate_text(prompt, config=config,
+                                   validate=lambda t: _parse_json_object(t) is not None,
+                                   use_cache=use_cache)
+    if not ok:
+        return False, text
+    data = _parse_json_object(text)
+    if data is None:
+        logging.error("genai returned invalid JSON: %s", text[:800])
+        return False, "ERROR: Gemini response was not a valid JSON object."
+    return True, data
+
+class AsyncRateLimiter:
+    """
+    Token bucket for asyncio callers: at most max_rate entries per time_period seconds.
+    Create one instance and share it between all requests, e.g.
+    `limiter = AsyncRateLimiter(500, 60)` then `async with limiter:` around each call for a
+    500 RPM quota; a new instance starts with a full bucket, so a limiter built per request
+    never throttles. Requests go out as soon as a token is available instead of after a fixed sleep.
+    """
+    def __init__(self, max_rate, time_period=60.0):
+        self.max_rate = max_rate
+        self.rate = max_rate / time_period
+        self._tokens = float(max_rate)
+        self._last = time.monotonic()
+
+    async def __aenter__(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.max_rate, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return self
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aexit__(self, *exc):
+        return False
+
+async def genai_generate_text_async(prompt, temperature=0.0, max_output_tokens=250, config=None, validate=None):
+    """Async counterpart of genai_generate_text (same cache), for fanning out many prompts with asyncio.gather."""
+    key = _cache_key(prompt, temperature, config)
+    cached = _cache_get(key)
+    if cached is not None and _cacheable(cached, validate):
+        return True, cached
+    try:
+        kwargs = {"config": config} if config else {}
+        # same backoff as the sync helper, but awaited: other gathered requests keep
+        # running while this one waits to retry
+        async for attempt in AsyncRetrying(wait=wait_exponential(multiplier=0.5, min=0.5, max=4),
+                                           stop=stop_after_attempt(3), reraise=True):
+            with attempt:
+                resp = await CLIENT.aio.models.generate_content(model=MODEL, contents=prompt, **kwargs)
+    except Exception as exc:
+        logging.error("Gemini async generate exception", exc_info=True)
+        return False, f"ERROR: Gemini call failed: {repr(exc)}"
+    ok, text, debug = _extract_text_from_response(resp)
+    if ok and text:
+        if _cacheable(text, validate):
+            _cache_set(key, text)
+        return True, text
+    logging.error("genai returned non-text response. debug=%s", debug)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("non-text response repr=%s", repr(resp)[:800])
+    return False, f"ERROR: Unexpected response shape from Gemini SDK. debug={debug}"
+
 @retry(wait=wait_exponential(multiplier=0.5, min=0.5, max=4), stop=stop_after_attempt(3))
-def genai_generate_text(prompt, temperature=0.0, max_output_tokens=250):
+def _genai_generate_text(prompt, temperature=0.0, max_output_tokens=250, config=None):
     try:
         # Call generate_content with minimal, widely-supported args
-        resp = CLIENT.models.generate_content(model=MODEL, contents=prompt)
+        kwargs = {"config": config} if config else {}
+        resp = CLIENT.models.generate_content(model=MODEL, contents=prompt, **kwargs)
         ok, text, debug = _extract_text_from_response(resp)
         if ok and text:
             return True, text
         else:
-            logging.error("genai returned non-text response. debug=%s repr=%s", debug, repr(resp)[:800])
+            logging.error("genai returned non-text response. debug=%s", debug)
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("non-text response repr=%s", repr(resp)[:800])
             # Try alternative client methods if available (use minimal args)
             if hasattr(CLIENT, "generate"):
                 try:
@@ -108,8 +287,4 @@ def genai_generate_text(prompt, temperature=0.0, max_output_tokens=250):
             return False, f"ERROR: Unexpected response shape from Gemini SDK. debug={debug}"
     except Exception as exc:
         logging.error("Gemini generate exception", exc_info=True)
-        tb = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
-        with open("logs/last_genai_error.txt", "w", encoding="utf8") as fh:
-            fh.write("TRACEBACK:\n")
-            fh.write(tb)
-        return False, f"ERROR: Gemini call failed: {repr(exc)}. See logs/last_genai_error.txt"
+        return False, f"ERROR: Gemini call failed: {repr(exc)}. See logs/genai_errors.log"
@@ -12,10 +12,24 @@ Other behavior:
 """
 import os
 import json
-import traceback
-from typing import Any, Dict, Optional
+import time
+import queue
+import atexit
+import asyncio
+import functools
+import threading
+import importlib.util
+import weakref
+from urllib.parse import quote
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported in sheet_to_df only; sheet_to_rows callers don't load it
 
-import pandas as pd
+try:
+    from orjson import loads as json_loads  # C parser, used when available
+except ImportError:
+    json_loads = json.loads
 
 try:
     import gspread
@@ -25,17 +39,91 @@ except Exception as _e:
     Credentials = None
     print("Warning: gspread/google oauth imports failed:", _e)
 
+try:
+    import httpx  # only needed for the async append path
+except ImportError:
+    httpx = None
+
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
 
+# column order of the submissions sheet (row 1)
+HEADER = ("id", "timestamp", "rating", "review", "ai_response", "ai_summary", "ai_actions")
+# column letters A..G of HEADER, so update ranges are plain string formatting
+_COL_A1 = tuple(chr(ord("A") + i) for i in range(len(HEADER)))
+
+# Authorized client + worksheet are built once and shared by every call (and thread);
+# rebuilt after SHEET_CACHE_TTL seconds or on invalidate_sheet_cache().
+SHEET_CACHE_TTL = 30 * 60
+_CACHE_LOCK = threading.RLock()
+_CLIENT = None
+_WS = None
+_WS_TS = 0.0
+
+# {id: sheet row number} built from the id column, so updates don't re-read the sheet to
+# locate a row. Appends from this process keep it current; the short TTL bounds how long
+# rows added or removed elsewhere can go unnoticed.
+ID_INDEX_TTL = 60
+_ID_INDEX: Dict[str, int] = {}
+_ID_HEADER: List[str] = []
+_ID_INDEX_TS = 0.0
+
+# parsed service-account info and the Credentials built from it; the secrets don't change
+# while the process runs, and google-auth refreshes the access token on the same object
+_SA_INFO: Optional[Dict[str, Any]] = None
+_CREDS = None
+
+# append_submission_async talks to the Sheets REST API directly over one pooled
+# httpx.AsyncClient per event loop (HTTP/2 when the optional h2 package is installed)
+SHEETS_API = "https://sheets.googleapis.com/v4/spreadsheets"
+_ASYNC_HTTP: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+# row 1 is checked against HEADER once per worksheet, not before every append
+_HEADER_VERIFIED = False
+
+# append_submission(..., sync=False) queues rows for a background thread that writes them
+# with one append_rows call per APPEND_FLUSH_INTERVAL seconds (or per APPEND_BATCH_MAX rows)
+APPEND_FLUSH_INTERVAL = 0.25
+APPEND_BATCH_MAX = 50
+# a failed flush is retried with backoff; after APPEND_RETRIES attempts the rows are saved
+# to UNSENT_FILE (one JSON object per line) for resend_unsent_submissions() to pick up
+APPEND_RETRIES = 3
+UNSENT_FILE = "data/unsent_submissions.jsonl"
+_APPEND_QUEUE: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+_APPEND_THREAD = None
+
+
+def _read_local_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf8") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+# local fallbacks, read once at import rather than stat'ed and opened on every lookup
+_LOCAL_GSERVICE_JSON = _read_local_file("gservice.json")
+_LOCAL_GSHEET_ID = _read_local_file("gsheet_id.txt")
+# st.secrets, resolved on first lookup (False when streamlit can't be imported)
+_ST_SECRETS = None
+
 
 def _st_secrets_get(key: str) -> Optional[Any]:
+    global _ST_SECRETS
+    if _ST_SECRETS is None:
+        try:
+            import streamlit as st  # local import to avoid import-time dependency issues
+            _ST_SECRETS = st.secrets
+        except Exception:
+            _ST_SECRETS = False
+    if _ST_SECRETS is False:
+        return None
     try:
-        import streamlit as st  # local import to avoid import-time dependency issues
-        return st.secrets.get(key)
+        return _ST_SECRETS.get(key)
     except Exception:
+        # no secrets.toml, or not running under Streamlit
         return None
 
 
@@ -45,12 +133,11 @@ def _env_get(key: str) -> Optional[str]:
 
 
 def _normalize_private_key(pk: Optional[str]) -> Optional[str]:
-    if pk is None:
-        return None
-    # convert escaped newlines to real newlines if necessary
-    if "\\n" in pk and "\n" not in pk:
-        return pk.replace("\\n", "\n")
-    return pk
+    # common case (no escaped newlines, or a key that already has real ones): return as-is
+    if pk is None or "\\n" not in pk or "\n" in pk:
+        return pk
+    # convert escaped newlines to real newlines
+    return pk.replace("\\n", "\n")
 
 
 def _convert_secret_to_dict(secret_obj: Any) -> Dict[str, Any]:
@@ -83,9 +170,35 @@ def _convert_secret_to_dict(secret_obj: Any) -> Dict[str, Any]:
         raise RuntimeError("Could not convert Streamlit secret object to dict; unsupported secret type.")
 
 
+def _parse_sa_blob(s: str) -> Dict[str, Any]:
+    """Parse a service-account JSON string, tolerating triple-quote wrapping and escaped JSON."""
+    s = s.strip()
+    if s.startswith('"""') and s.endswith('"""'):
+        s = s[3:-3].strip()
+    try:
+        return json_loads(s)
+    except ValueError:
+        # stdlib json for the escaped form; orjson is stricter about what it accepts
+        return json.loads(s.encode("utf-8").decode("unicode_escape"))
+
+
 def _load_service_account_info() -> Dict[str, Any]:
     """
     Load service-account info into a dict suitable for Credentials.from_service_account_info(...)
+    (parsed once per process, see _read_service_account_info for the sources).
+    """
+    global _SA_INFO
+    with _CACHE_LOCK:
+        if _SA_INFO is None:
+            sa = _read_service_account_info()
+            if "private_key" in sa:
+                sa["private_key"] = _normalize_private_key(sa["private_key"])
+            _SA_INFO = sa
+        return _SA_INFO
+
+
+def _read_service_account_info() -> Dict[str, Any]:
+    """
     Priority:
       1) st.secrets['gs_service'] (table/dict-like)
       2) st.secrets['GSERVICE_JSON'] (string or dict)
@@ -96,69 +209,35 @@ def _load_service_account_info() -> Dict[str, Any]:
     st_sa = _st_secrets_get("gs_service")
     if st_sa:
         try:
-            sa = _convert_secret_to_dict(st_sa)
-            if "private_key" in sa:
-                sa["private_key"] = _normalize_private_key(sa["private_key"])
-            return sa
+            return _convert_secret_to_dict(st_sa)
         except Exception as e:
-            raise RuntimeError(f"Found st.secrets['gs_service'] but failed to parse it: {e}")
+            raise RuntimeError(f"Found st.secrets['gs_service'] but failed to parse it: {e}") from e
 
     # 2) Streamlit GSERVICE_JSON (string or dict)
     st_json = _st_secrets_get("GSERVICE_JSON")
     if st_json:
         if isinstance(st_json, dict):
-            sa = dict(st_json)
-            if "private_key" in sa:
-                sa["private_key"] = _normalize_private_key(sa["private_key"])
-            return sa
+            return dict(st_json)
         if isinstance(st_json, str):
-            s = st_json.strip()
-            if s.startswith('"""') and s.endswith('"""'):
-                s = s[3:-3].strip()
             try:
-                sa = json.loads(s)
-                if "private_key" in sa:
-                    sa["private_key"] = _normalize_private_key(sa["private_key"])
-                return sa
+                return _parse_sa_blob(st_json)
             except Exception:
-                try:
-                    sa = json.loads(s.encode("utf-8").decode("unicode_escape"))
-                    if "private_key" in sa:
-                        sa["private_key"] = _normalize_private_key(sa["private_key"])
-                    return sa
-                except Exception:
-                    raise RuntimeError("st.secrets['GSERVICE_JSON'] present but not valid JSON.")
+                raise RuntimeError("st.secrets['GSERVICE_JSON'] present but not valid JSON.")
 
     # 3) Environment variable GSERVICE_JSON
     env_json = _env_get("GSERVICE_JSON")
     if env_json:
-        s = env_json.strip()
-        if s.startswith('"""') and s.endswith('"""'):
-            s = s[3:-3].strip()
         try:
-            sa = json.loads(s)
-            if "private_key" in sa:
-                sa["private_key"] = _normalize_private_key(sa["private_key"])
-            return sa
+            return _parse_sa_blob(env_json)
         except Exception:
-            try:
-                sa = json.loads(s.encode("utf-8").decode("unicode_escape"))
-                if "private_key" in sa:
-                    sa["private_key"] = _normalize_private_key(sa["private_key"])
-                return sa
-            except Exception:
-                raise RuntimeError("GSERVICE_JSON env var present but not valid JSON.")
+            raise RuntimeError("GSERVICE_JSON env var present but not valid JSON.")
 
     # 4) local file fallback
-    if os.path.exists("gservice.json"):
+    if _LOCAL_GSERVICE_JSON is not None:
         try:
-            with open("gservice.json", "r", encoding="utf8") as fh:
-                sa = json.load(fh)
-            if "private_key" in sa:
-                sa["private_key"] = _normalize_private_key(sa["private_key"])
-            return sa
+            return json_loads(_LOCAL_GSERVICE_JSON)
         except Exception as e:
-            raise RuntimeError(f"Failed to read local gservice.json: {e}")
+            raise RuntimeError(f"Failed to read local gservice.json: {e}") from e
 
     raise RuntimeError(
         "Service account JSON not found. Set GSERVICE_JSON env var (minified JSON) or add a 'gs_service' table "
@@ -166,7 +245,9 @@ def _load_service_account_info() -> Dict[str, Any]:
     )
 
 
+@functools.lru_cache(maxsize=1)
 def _get_gsheet_id() -> str:
+    # memoised like the service-account info: changing the sheet id needs a restart
     sid = _st_secrets_get("GSHEET_ID")
     if sid:
         return str(sid).strip()
@@ -176,45 +257,122 @@ def _get_gsheet_id() -> str:
     sid = _env_get("GSHEET_ID") or _env_get("gsheet_id")
     if sid:
         return sid.strip()
-    if os.path.exists("gsheet_id.txt"):
-        with open("gsheet_id.txt", "r", encoding="utf8") as fh:
-            data = fh.read().strip()
-            if data:
-                return data
+    if _LOCAL_GSHEET_ID and _LOCAL_GSHEET_ID.strip():
+        return _LOCAL_GSHEET_ID.strip()
     raise RuntimeError("GSHEET_ID not found in st.secrets, environment, or gsheet_id.txt")
 
 
 def get_gspread_client():
+    global _CLIENT
+    with _CACHE_LOCK:
+        if _CLIENT is None:
+            _CLIENT = _build_gspread_client()
+        return _CLIENT
+
+
+def _get_credentials():
+    # the RSA key is parsed once; rebuilding the client (TTL, 401) reuses these credentials
+    global _CREDS
+    with _CACHE_LOCK:
+        if _CREDS is None:
+            try:
+                sa_info = _load_service_account_info()
+            except Exception as e:
+                raise RuntimeError(f"Failed to load service account info: {e}") from e
+
+            try:
+                _CREDS = Credentials.from_service_account_info(sa_info, scopes=SCOPES)
+            except Exception as e:
+                raise RuntimeError(f"Failed to create Credentials from service account info: {e}") from e
+        return _CREDS
+
+
+def _build_gspread_client():
     if gspread is None or Credentials is None:
         raise RuntimeError("Missing required libraries: ensure 'gspread' and 'google-auth' are installed.")
 
-    try:
-        sa_info = _load_service_account_info()
-    except Exception as e:
-        raise RuntimeError(f"Failed to load service account info: {e}")
-
-    try:
-        creds = Credentials.from_service_account_info(sa_info, scopes=SCOPES)
-    except Exception as e:
-        tb = traceback.format_exc()
-        raise RuntimeError(f"Failed to create Credentials from service account info: {e}\n{tb}")
+    creds = _get_credentials()
 
     try:
         client = gspread.authorize(creds)
         return client
     except Exception as e:
-        tb = traceback.format_exc()
-        raise RuntimeError(f"Failed to authorize gspread client: {e}\n{tb}")
+        raise RuntimeError(f"Failed to authorize gspread client: {e}") from e
+
+
+def invalidate_sheet_cache() -> None:
+    """Drop the cached client and worksheet (e.g. after an auth error); the next call rebuilds them."""
+    global _CLIENT, _WS, _WS_TS, _HEADER_VERIFIED
+    with _CACHE_LOCK:
+        _CLIENT = None
+        _WS = None
+        _WS_TS = 0.0
+        _HEADER_VERIFIED = False
+        _reset_id_index()
+
+
+def _reset_id_index() -> None:
+    global _ID_INDEX, _ID_HEADER, _ID_INDEX_TS
+    with _CACHE_LOCK:
+        _ID_INDEX = {}
+        _ID_HEADER = []
+        _ID_INDEX_TS = 0.0
+
+
+def _load_id_index(ws, force: bool = False):
+    """Return the cached ({id: row}, header) pair, re-reading the id column when stale or forced."""
+    global _ID_INDEX, _ID_HEADER, _ID_INDEX_TS
+    with _CACHE_LOCK:
+        if not force and _ID_INDEX_TS and time.monotonic() - _ID_INDEX_TS < ID_INDEX_TTL:
+            return _ID_INDEX, _ID_HEADER
+        # header row and the id column (A, as written by append_submissions) in one request;
+        # only the id column is needed to locate a row, not every record
+        header_rows, id_rows = ws.batch_get(["1:1", "A2:A"])
+        header = header_rows[0] if header_rows else []
+        if "id" not in header:
+            ids = []
+        elif header.index("id") == 0:
+            ids = [r[0] if r else "" for r in id_rows]
+        else:
+            ids = ws.col_values(header.index("id") + 1)[1:]
+        _ID_INDEX = {v: i for i, v in enumerate(ids, start=2)}
+        _ID_HEADER = header
+        _ID_INDEX_TS = time.monotonic()
+        return _ID_INDEX, _ID_HEADER
+
+
+def _record_appended_ids(resp, rows: List[Dict[str, Any]]) -> None:
+    # the append response says where the rows landed; fold that into a loaded index
+    # instead of re-reading the id column on the next update
+    try:
+        first_cell = resp["updates"]["updatedRange"].split("!")[-1].split(":")[0]
+        start = gspread.utils.a1_to_rowcol(first_cell)[0]
+    except Exception:
+        _reset_id_index()
+        return
+    with _CACHE_LOCK:
+        if _ID_INDEX_TS:
+            for offset, row_dict in enumerate(rows):
+                _ID_INDEX[str(row_dict.get("id", ""))] = start + offset
 
 
 def _open_sheet():
-    client = get_gspread_client()
+    global _WS, _WS_TS
+    with _CACHE_LOCK:
+        if _WS is not None and time.monotonic() - _WS_TS < SHEET_CACHE_TTL:
+            return _WS
+        invalidate_sheet_cache()
+        _WS = _build_sheet(get_gspread_client())
+        _WS_TS = time.monotonic()
+        return _WS
+
+
+def _build_sheet(client):
     sheet_id = _get_gsheet_id()
     try:
         sh = client.open_by_key(sheet_id)
     except Exception as e:
-        tb = traceback.format_exc()
-        raise RuntimeError(f"Failed to open spreadsheet with id={sheet_id}: {e}\n{tb}")
+        raise RuntimeError(f"Failed to open spreadsheet with id={sheet_id}: {e}") from e
     try:
         ws = sh.sheet1
     except Exception:
@@ -222,47 +380,281 @@ def _open_sheet():
     return ws
 
 
-def sheet_to_df() -> pd.DataFrame:
-    ws = _open_sheet()
-    rows = ws.get_all_records()
-    expected = ["id", "timestamp", "rating", "review", "ai_response", "ai_summary", "ai_actions"]
-    if not rows:
-        return pd.DataFrame(columns=expected)
-    df = pd.DataFrame(rows)
-    for c in expected:
-        if c not in df.columns:
-            df[c] = ""
-    return df[expected]
+def _retry_on_auth_error(fn):
+    """Drop the cached client/worksheet and retry once if the Sheets API answers 401."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if getattr(getattr(e, "response", None), "status_code", None) != 401:
+                raise
+            invalidate_sheet_cache()
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _sheet_values() -> List[List[str]]:
+    # only the HEADER columns A:G rather than the whole used grid
+    return _open_sheet().get_values("A1:G")
+
+
+@_retry_on_auth_error
+def sheet_to_rows() -> List[Dict[str, str]]:
+    """Submissions as plain {column: value} dicts (HEADER keys, values as stored), no pandas."""
+    vals = _sheet_values()
+    if len(vals) < 2:
+        return []
+    pos = [vals[0].index(c) if c in vals[0] else None for c in HEADER]
+    return [
+        {c: (row[p] if p is not None and p < len(row) else "") for c, p in zip(HEADER, pos)}
+        for row in vals[1:]
+    ]
+
+
+@_retry_on_auth_error
+def sheet_to_df() -> "pd.DataFrame":
+    import pandas as pd
+
+    # list-of-lists straight into the frame (get_all_records() would build a dict per row first)
+    vals = _sheet_values()
+    if len(vals) < 2:
+        return pd.DataFrame(columns=list(HEADER))
+    # missing columns come back empty, extra ones are dropped
+    df = pd.DataFrame(vals[1:], columns=vals[0]).reindex(columns=list(HEADER), fill_value="")
+    # ratings are 1-5: downcast to int8 (stays float only if a cell is blank/invalid)
+    df["rating"] = pd.to_numeric(df["rating"], errors="coerce", downcast="integer")
+    return df
+
+
+def append_submission(row_dict: Dict[str, Any], sync: bool = True) -> bool:
+    """
+    Append one submission. With sync=False the row is queued and written by a
+    background thread together with any other rows queued around the same time;
+    call flush_appends() to wait for the queue to drain.
+    """
+    if sync:
+        return append_submissions([row_dict])
+    _start_append_worker()
+    _APPEND_QUEUE.put(row_dict)
+    return True
 
 
-def append_submission(row_dict: Dict[str, Any]) -> bool:
-    ws = _open_sheet()
-    header = ["id", "timestamp", "rating", "review", "ai_response", "ai_summary", "ai_actions"]
+def flush_appends() -> None:
+    """Block until every queued row has been written (or has failed)."""
+    if _APPEND_THREAD is not None:
+        _APPEND_QUEUE.join()
+
+
+def _start_append_worker() -> None:
+    global _APPEND_THREAD
+    with _CACHE_LOCK:
+        if _APPEND_THREAD is None:
+            _APPEND_THREAD = threading.Thread(target=_append_worker, name="sheets-append", daemon=True)
+            _APPEND_THREAD.start()
+            # the worker is a daemon thread: don't drop rows still queued at interpreter exit
+            atexit.register(flush_appends)
+
+
+def _append_worker() -> None:
+    while True:
+        rows = [_APPEND_QUEUE.get()]
+        deadline = time.monotonic() + APPEND_FLUSH_INTERVAL
+        while len(rows) < APPEND_BATCH_MAX:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(_APPEND_QUEUE.get(timeout=timeout))
+            except queue.Empty:
+                break
+        try:
+            for attempt in range(APPEND_RETRIES):
+                try:
+                    append_submissions(rows)
+                    break
+                except Exception as e:
+                    error = e
+                    if attempt < APPEND_RETRIES - 1:
+                        time.sleep(2 ** attempt)
+            else:
+                _save_unsent(rows, error)
+        finally:
+            for _ in rows:
+                _APPEND_QUEUE.task_done()
+
+
+def _save_unsent(rows: List[Dict[str, Any]], error: Exception) -> None:
+    # the caller already got True back, so never just drop the rows
     try:
-        existing = ws.row_values(1)
-    except Exception:
-        existing = []
-    if not existing or existing[: len(header)] != header:
+        os.makedirs(os.path.dirname(UNSENT_FILE), exist_ok=True)
+        with _CACHE_LOCK, open(UNSENT_FILE, "a", encoding="utf8") as fh:
+            for row_dict in rows:
+                fh.write(json.dumps(row_dict, default=str) + "\n")
+        print(f"Warning: failed to append {len(rows)} queued submission(s) to the sheet; "
+              f"saved to {UNSENT_FILE}:", error)
+    except OSError as e:
+        print(f"Warning: failed to append or save {len(rows)} queued submission(s):", error, e, rows)
+
+
+def resend_unsent_submissions() -> int:
+    """Append the rows saved in UNSENT_FILE after failed background flushes; returns how many were sent."""
+    with _CACHE_LOCK:
         try:
-            ws.update("A1:G1", [header])
-        except Exception:
-            ws.insert_row(header, 1)
-    row = [row_dict.get(k, "") for k in header]
-    ws.append_row(row, value_input_option="USER_ENTERED")
+            with open(UNSENT_FILE, "r", encoding="utf8") as fh:
+                rows = [json.loads(line) for line in fh if line.strip()]
+        except FileNotFoundError:
+            return 0
+        append_submissions(rows)
+        os.remove(UNSENT_FILE)
+        return len(rows)
+
+
+@_retry_on_auth_error
+def append_submissions(rows: List[Dict[str, Any]]) -> bool:
+    """
+    Append several submissions with a single Sheets API request (ws.append_rows),
+    so N buffered rows cost one round-trip instead of N.
+    """
+    global _HEADER_VERIFIED
+    if not rows:
+        return True
+    ws = _open_sheet()
+    header = list(HEADER)
+    values = [[row_dict.get(k, "") for k in header] for row_dict in rows]
+    if not _HEADER_VERIFIED:
+        # check-and-write under the lock: concurrent first writers (queue worker, sessions,
+        # async gather) must not all see an empty sheet and each write a header
+        with _CACHE_LOCK:
+            if not _HEADER_VERIFIED:
+                try:
+                    top = ws.get_values("1:2")
+                except Exception:
+                    top = None
+                if top is not None and not any(map(any, top)):
+                    # empty sheet: header and rows go out in one append request; append
+                    # (not a fixed range) never overwrites rows that are already there
+                    ws.append_rows([header] + values, value_input_option="USER_ENTERED")
+                    _reset_id_index()
+                    _HEADER_VERIFIED = True
+                    return True
+                existing = top[0] if top else []
+                if existing[: len(header)] != header:
+                    # header (and possibly row positions) change: the id index no longer applies
+                    _reset_id_index()
+                    try:
+                        ws.update("A1:G1", [header])
+                    except Exception:
+                        ws.insert_row(header, 1)
+                _HEADER_VERIFIED = True
+    resp = ws.append_rows(values, value_input_option="USER_ENTERED")
+    _record_appended_ids(resp, rows)
     return True
 
 
+def _col_letter(col: int) -> str:
+    # 0-based column -> A1 letter; anything past HEADER (extra sheet columns) is computed
+    if col < len(_COL_A1):
+        return _COL_A1[col]
+    return gspread.utils.rowcol_to_a1(1, col + 1)[:-1]
+
+
+@_retry_on_auth_error
 def update_submission_by_id(sub_id: str, updates: Dict[str, Any]) -> bool:
     ws = _open_sheet()
-    records = ws.get_all_records()
-    if not records:
+    row_by_id, header = _load_id_index(ws)
+    idx = row_by_id.get(str(sub_id))
+    if idx is None:
+        # may have been appended by another process since the index was built
+        row_by_id, header = _load_id_index(ws, force=True)
+        idx = row_by_id.get(str(sub_id))
+    if idx is None:
         return False
-    header = ws.row_values(1)
-    for idx, rec in enumerate(records, start=2):
-        if str(rec.get("id")) == str(sub_id):
-            for key, val in updates.items():
-                if key in header:
-                    col_index = header.index(key) + 1
-                    ws.update_cell(idx, col_index, val)
-            return True
-    return False
+    # one batch request for all changed cells instead of an update_cell round-trip each;
+    # adjacent columns (e.g. ai_summary + ai_actions) share a single range
+    cells = sorted((header.index(key), val) for key, val in updates.items() if key in header)
+    data = []
+    for col, val in cells:
+        if data and col == data[-1]["end"] + 1:
+            data[-1]["values"][0].append(val)
+            data[-1]["end"] = col
+        else:
+            data.append({"start": col, "end": col, "values": [[val]]})
+    data = [
+        {"range": f"{_col_letter(d['start'])}{idx}:{_col_letter(d['end'])}{idx}", "values": d["values"]}
+        for d in data
+    ]
+    if data:
+        ws.batch_update(data, value_input_option="USER_ENTERED")
+    return True
+
+
+def _access_token(force_refresh: bool = False) -> str:
+    from google.auth.transport.requests import Request
+
+    creds = _get_credentials()
+    with _CACHE_LOCK:
+        if force_refresh or not creds.valid:
+            creds.refresh(Request())
+        return creds.token
+
+
+def _async_http():
+    # pooled connections belong to the loop that opened them, so one client per loop (each
+    # Streamlit session thread runs its own). Another loop's client is never closed from
+    # here; entries of closed loops are dropped, collected loops leave the weak dict by themselves
+    loop = asyncio.get_running_loop()
+    with _CACHE_LOCK:
+        for other in [lp for lp in _ASYNC_HTTP.keys() if lp.is_closed()]:
+            del _ASYNC_HTTP[other]
+        client = _ASYNC_HTTP.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_connections=20),
+                timeout=30,
+            )
+            _ASYNC_HTTP[loop] = client
+        return client
+
+
+async def append_submission_async(row_dict: Dict[str, Any]) -> bool:
+    return await append_submissions_async([row_dict])
+
+
+async def append_submissions_async(rows: List[Dict[str, Any]]) -> bool:
+    """
+    Async counterpart of append_submissions: POSTs to the values.append REST endpoint
+    over a pooled httpx.AsyncClient, so concurrent submissions overlap instead of each
+    blocking a thread on gspread.
+    """
+    if not rows:
+        return True
+    if httpx is None:
+        raise RuntimeError("append_submissions_async requires 'httpx' (pip install httpx).")
+    if not _HEADER_VERIFIED:
+        # the first write goes through the sync path, which checks / creates the header row
+        return await asyncio.to_thread(append_submissions, rows)
+    http = _async_http()
+    values = [[row_dict.get(k, "") for k in HEADER] for row_dict in rows]
+    for attempt in range(2):
+        ws = await asyncio.to_thread(_open_sheet)
+        creds = _CREDS
+        if attempt == 0 and creds is not None and creds.valid:
+            token = creds.token
+        else:
+            token = await asyncio.to_thread(_access_token, attempt > 0)
+        rng = quote(gspread.utils.absolute_range_name(ws.title, "A1"), safe="")
+        resp = await http.post(
+            f"{SHEETS_API}/{ws.spreadsheet.id}/values/{rng}:append",
+            params={"valueInputOption": "USER_ENTERED"},
+            headers={"Authorization": f"Bearer {token}"},
+            json={"values": values},
+        )
+        if resp.status_code != 401 or attempt:
+            break
+        # same as _retry_on_auth_error: drop the cached sheet state and retry once with a new token
+        invalidate_sheet_cache()
+    resp.raise_for_status()
+    _record_appended_ids(resp.json(), rows)
+    return True